@@ -1,6 +1,10 @@
 import typing as t
+import concurrent.futures
 import pathlib
 import logging
+import queue
+import threading
+import time
 
 import bpy
 import bpy.utils.previews  # type: ignore
@@ -11,25 +15,149 @@ from .ikea_lib import IkeaApiWrapper, IkeaException
 log = logging.getLogger(__name__)
 thumbs = bpy.utils.previews.new()
 ikea = IkeaApiWrapper("ie", "en")
-search_results = []
+search_results: t.List[t.Dict[str, t.Any]] = []
 
 
-def _get_thumbnail_icon(itemNo: str, url: str) -> int:
-    if itemNo not in thumbs:
-        if not bpy.app.online_access:
-            # this function _should_ never be called without online access,
-            # but just in case, let's make extra sure we never make network
-            # calls without it.
-            raise IkeaException("Can't load thumbnail without internet access")
-        filename = ikea.get_thumbnail(itemNo, url)
-        ip = thumbs.load(itemNo, filename, "IMAGE")
+# Built-in icon to show while a thumbnail is still downloading
+PLACEHOLDER_ICON_ID = bpy.types.UILayout.bl_rna.functions["prop"].parameters["icon"].enum_items["TIME"].value
+THUMBNAIL_WORKERS = 4
+# how long to wait before trying a thumbnail again after it failed, so
+# that a broken download isn't retried on every redraw
+THUMBNAIL_RETRY_DELAY = 60
+
+# LIFO so that whatever was drawn most recently (ie, what the user is
+# looking at right now) gets downloaded first
+_thumb_queue: "queue.LifoQueue[t.Tuple[str, str]]" = queue.LifoQueue(maxsize=256)
+_thumbs_pending: t.Set[str] = set()
+# when each thumbnail last failed to download or load
+_thumbs_failed: t.Dict[str, float] = {}
+_workers: t.List[threading.Thread] = []
+
+# bpy isn't thread-safe (and neither is bpy.app.timers.register), so
+# background threads put their callbacks here, and a timer on the main
+# thread runs them
+_main_thread_queue: "queue.Queue[t.Tuple[t.Callable[..., None], t.Tuple[t.Any, ...]]]" = queue.Queue()
+MAIN_THREAD_INTERVAL = 0.1
+
+
+def _call_on_main_thread(fn: t.Callable[..., None], *args: t.Any) -> None:
+    _main_thread_queue.put((fn, args))
+
+
+def _run_main_thread_callbacks() -> float:
+    """
+    Timer which runs the callbacks queued by _call_on_main_thread().
+    """
+    while True:
+        try:
+            fn, args = _main_thread_queue.get_nowait()
+        except queue.Empty:
+            return MAIN_THREAD_INTERVAL
+        try:
+            fn(*args)
+        except Exception:
+            # keep the timer going for everybody else's callbacks
+            log.exception("Error in %s:", fn)
 
-        # it appears that images don't always fully load when thumbs.load()
-        # is called, but accessing the image_size property forces the image
-        # to load fully???
-        _wat = ip.image_size[0] + ip.image_size[1]
 
-    return thumbs[itemNo].icon_id
+def _thumbnail_worker() -> None:
+    """
+    Download thumbnails in the background, then hand them over to the
+    main thread for loading (bpy.utils.previews isn't thread-safe).
+    """
+    while True:
+        itemNo, url = _thumb_queue.get()
+        try:
+            filename = ikea.get_thumbnail(itemNo, url)
+        except IkeaException:
+            # ikea.get_thumbnail() has already logged the details
+            _call_on_main_thread(_thumbnail_failed, itemNo)
+            continue
+        except Exception:
+            # this thread has to outlive any one thumbnail, otherwise
+            # we'd eventually run out of workers
+            log.exception("Error getting thumbnail for #%s:", itemNo)
+            _call_on_main_thread(_thumbnail_failed, itemNo)
+            continue
+        _call_on_main_thread(_load_thumbnail, itemNo, filename)
+
+
+def _load_thumbnail(itemNo: str, filename: str) -> None:
+    try:
+        if itemNo not in thumbs:
+            ip = thumbs.load(itemNo, filename, "IMAGE")
+
+            # it appears that images don't always fully load when thumbs.load()
+            # is called, but accessing the image_size property forces the image
+            # to load fully???
+            _wat = ip.image_size[0] + ip.image_size[1]
+    except Exception:
+        log.exception("Error loading thumbnail for #%s:", itemNo)
+        _thumbs_failed[itemNo] = time.monotonic()
+    finally:
+        _thumbs_pending.discard(itemNo)
+    _redraw()
+
+
+def _thumbnail_failed(itemNo: str) -> None:
+    _thumbs_failed[itemNo] = time.monotonic()
+    _thumbs_pending.discard(itemNo)
+
+
+def _get_thumbnail_icon(itemNo: str, url: str) -> t.Optional[int]:
+    """
+    Get the icon for a product thumbnail, or None if it is still being
+    downloaded (in which case the panels will be redrawn once it's ready).
+    """
+    if itemNo in thumbs:
+        return thumbs[itemNo].icon_id
+
+    _request_thumbnail(itemNo, url)
+    return None
+
+
+def _request_thumbnail(itemNo: str, url: str) -> None:
+    """
+    Queue a thumbnail for loading in the background, unless it is already
+    loaded or on its way.
+    """
+    if itemNo in thumbs or itemNo in _thumbs_pending:
+        return
+    failed = _thumbs_failed.get(itemNo)
+    if failed is not None and time.monotonic() - failed < THUMBNAIL_RETRY_DELAY:
+        return
+    if not bpy.app.online_access:
+        # this function _should_ never be called without online access,
+        # but just in case, let's make extra sure we never make network
+        # calls without it.
+        raise IkeaException("Can't load thumbnail without internet access")
+    try:
+        _thumb_queue.put_nowait((itemNo, url))
+        _thumbs_pending.add(itemNo)
+    except queue.Full:
+        # try again on the next redraw
+        pass
+
+
+_pip_futures: t.Dict[str, "concurrent.futures.Future[t.Dict[str, t.Any]]"] = {}
+
+
+def _get_pip(itemNo: str) -> t.Optional[t.Dict[str, t.Any]]:
+    """
+    Get product information, or None if it is still being downloaded (in
+    which case the panels will be redrawn once it's ready).
+    """
+    future = _pip_futures.get(itemNo)
+    # (cancelled if the add-on was disabled while it was downloading)
+    if future is None or future.cancelled():
+        future = ikea.get_pip_future(itemNo)
+        if not future.done():
+            _pip_futures[itemNo] = future
+            future.add_done_callback(lambda _: _call_on_main_thread(_redraw))
+    if not future.done():
+        return None
+    _pip_futures.pop(itemNo, None)
+    return future.result()
 
 
 def _init(self, context):
@@ -41,8 +169,15 @@ def _init(self, context):
     prefs = bpy.context.preferences.addons[__package__].preferences
     addon_dir = pathlib.Path(bpy.utils.extension_path_user(__package__))
 
+    # background threads might still be using the old wrapper, so let
+    # its queued downloads finish rather than cancelling them (requests
+    # already in progress are never cut off, see IkeaApiWrapper.close())
+    old_ikea = ikea
     ikea = IkeaApiWrapper(prefs.country, prefs.language)
     ikea.cache_dir = addon_dir / "cache"
+    threading.Thread(target=old_ikea.close, kwargs={"wait": True}, daemon=True).start()
+    # these were for the old country / language
+    _pip_futures.clear()
 
     logging.basicConfig(
         level=logging.DEBUG if prefs.debug else logging.INFO,
@@ -86,12 +221,44 @@ class IkeaImportOperator(bpy.types.Operator):
                 self.report({"ERROR"}, "Blender is missing the glTF import add-on, please enable it in Preferences")
                 return {"CANCELLED"}
 
+            # look these up once, rather than going back through bpy for
+            # every imported object
+            itemNo = self.itemNo
+            name = pip["name"]
+            location = bpy.context.scene.cursor.location.copy()
             for obj in bpy.context.selected_objects:
                 assert isinstance(obj, bpy.types.Object)
-                obj["ikeaItemNo"] = self.itemNo
-                obj.name = pip["name"]
+                obj["ikeaItemNo"] = itemNo
+                obj.name = name
                 if not obj.parent:
-                    obj.location = bpy.context.scene.cursor.location
+                    obj.location = location
+        except IkeaException as e:
+            self.report({"ERROR"}, str(e))
+        return {"FINISHED"}
+
+
+class IkeaRefreshOperator(bpy.types.Operator):
+    """
+    Check ikea.com for updated product information and thumbnail.
+    """
+
+    bl_idname = "ikea.refresh"
+    bl_label = "Refresh product details"
+
+    itemNo: bpy.props.StringProperty()  # type: ignore
+
+    def execute(self, context) -> t.Set[str]:
+        if not bpy.app.online_access:
+            self.report({"ERROR"}, "IKEA Browser requires online access")
+            return {"CANCELLED"}
+
+        try:
+            pip = ikea.get_pip(self.itemNo, refresh=True)
+            ikea.get_thumbnail(self.itemNo, pip["mainImage"]["url"], refresh=True)
+            # let the panel try again straight away, if it had given up
+            _thumbs_failed.pop(self.itemNo, None)
+            if self.itemNo in thumbs:
+                thumbs[self.itemNo].reload()
         except IkeaException as e:
             self.report({"ERROR"}, str(e))
         return {"FINISHED"}
@@ -120,20 +287,25 @@ class IkeaBrowserPanel(bpy.types.Panel):
         layout = self.layout
         layout.prop(context.window_manager, "ikea_search", text="", icon="VIEWZOOM")
 
+        if not search_results:
+            if not context.window_manager.ikea_search:
+                layout.label(text="Type to search")
+            elif _results_id != _search_id:
+                layout.label(text="Searching...")
+            else:
+                layout.label(text="No results")
+            return
+
         grid = layout.grid_flow(even_columns=True)
         for result in search_results:
             box = grid.box()
             box.label(text=result["mainImageAlt"])
-            icon = _get_thumbnail_icon(result["itemNo"], result["mainImageUrl"])
+            icon = _get_thumbnail_icon(result["itemNo"], result["mainImageUrl"]) or PLACEHOLDER_ICON_ID
             box.template_icon(icon_value=icon, scale=10)
             btn = box.operator(IkeaImportOperator.bl_idname, text="Import")
             btn.itemNo = result["itemNo"]
 
 
-_last_itemNo = None
-_last_pip = None
-
-
 class IkeaProductPanel(bpy.types.Panel):
     """
     If the currently selected object has an "ikeaItemNo" property, display
@@ -151,8 +323,6 @@ class IkeaProductPanel(bpy.types.Panel):
         return context.object and context.object.get("ikeaItemNo")
 
     def draw(self, context) -> None:
-        global _last_pip, _last_itemNo
-
         layout = self.layout
         itemNo = context.object.get("ikeaItemNo")
 
@@ -164,14 +334,12 @@ class IkeaProductPanel(bpy.types.Panel):
             layout.label(text="Enable online access to see more details")
             return
 
-        if itemNo == _last_itemNo:
-            pip = _last_pip
-        else:
-            pip = ikea.get_pip(itemNo)
-            _last_itemNo = itemNo
-            _last_pip = pip
+        pip = _get_pip(itemNo)
+        if pip is None:
+            layout.label(text="Loading...")
+            return
 
-        icon = _get_thumbnail_icon(itemNo, pip["mainImage"]["url"])
+        icon = _get_thumbnail_icon(itemNo, pip["mainImage"]["url"]) or PLACEHOLDER_ICON_ID
         layout.template_icon(icon_value=icon, scale=10)
 
         grid = layout.grid_flow(row_major=True, even_rows=False, columns=2)
@@ -184,15 +352,80 @@ class IkeaProductPanel(bpy.types.Panel):
         grid.label(text="Type")
         grid.label(text=pip["typeName"])
 
-        layout.operator("wm.url_open", text="Open Website").url = pip["pipUrl"]
+        row = layout.row()
+        row.operator("wm.url_open", text="Open Website").url = pip["pipUrl"]
+        row.operator(IkeaRefreshOperator.bl_idname, text="Refresh").itemNo = itemNo
+
+
+def _redraw() -> None:
+    """
+    Tag all 3D views for redraw, so that panels pick up results which
+    arrived from a background thread.
+    """
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
+
+
+_search_id = 0
+# the search that search_results came from
+_results_id = 0
+_search_queue: "queue.Queue[t.Tuple[str, int]]" = queue.Queue()
+
+
+def _search_worker() -> None:
+    """
+    Run searches in a background thread, then hand the results back to
+    the main thread (bpy isn't thread-safe, so we can't touch any blender
+    state from here).
+
+    This is one long-lived thread rather than a new thread per search, so
+    that its keep-alive connection to the search API gets reused.
+    """
+    while True:
+        query, search_id = _search_queue.get()
+        if search_id != _search_id:
+            # another search was started before this one got going
+            continue
+        try:
+            # prefetching warms the PIP cache, in case the user imports
+            # something; _apply_search() queues up the thumbnails
+            results = ikea.search(query, prefetch=True)
+        except IkeaException:
+            # ikea.search() has already logged the details
+            results = []
+        except Exception:
+            # this thread has to outlive any one search, otherwise every
+            # later search would be stuck at "Searching..."
+            log.exception("Error searching for %s:", query)
+            results = []
+        _call_on_main_thread(_apply_search, results, search_id)
+
+
+def _apply_search(results: t.List[t.Dict[str, t.Any]], search_id: int) -> None:
+    global search_results, _results_id
+    if search_id != _search_id:
+        # results for an old query arrived after a newer query was started
+        return
+    search_results = results
+    _results_id = search_id
+    # Start fetching every thumbnail now rather than waiting for the panel
+    # to draw each one; the queue is LIFO, so queue the first result last
+    if bpy.app.online_access:
+        for result in reversed(results):
+            _request_thumbnail(result["itemNo"], result["mainImageUrl"])
+    _redraw()
 
 
 def _update_search(self, context) -> None:
-    global search_results
+    global search_results, _search_id, _results_id
+    _search_id += 1
     if bpy.app.online_access:
-        search_results = ikea.search(self.ikea_search)
+        _search_queue.put((self.ikea_search, _search_id))
     else:
         search_results = []
+        _results_id = _search_id
 
 
 def register() -> None:
@@ -203,13 +436,29 @@ def register() -> None:
     bpy.utils.register_class(IkeaBrowserPanel)
     bpy.utils.register_class(IkeaProductPanel)
     bpy.utils.register_class(IkeaImportOperator)
+    bpy.utils.register_class(IkeaRefreshOperator)
 
     _init(None, None)
+    bpy.app.timers.register(_run_main_thread_callbacks, persistent=True)
+    threading.Thread(target=ikea.clean_thumbnails, daemon=True).start()
+
+    global _workers
+    if not _workers:
+        _workers = [threading.Thread(target=_search_worker, daemon=True)] + [
+            threading.Thread(target=_thumbnail_worker, daemon=True)
+            for _ in range(THUMBNAIL_WORKERS)
+        ]
+        for worker in _workers:
+            worker.start()
 
 
 def unregister() -> None:
+    if bpy.app.timers.is_registered(_run_main_thread_callbacks):
+        bpy.app.timers.unregister(_run_main_thread_callbacks)
     del bpy.types.WindowManager.ikea_search
+    bpy.utils.unregister_class(IkeaRefreshOperator)
     bpy.utils.unregister_class(IkeaImportOperator)
     bpy.utils.unregister_class(IkeaProductPanel)
     bpy.utils.unregister_class(IkeaBrowserPanel)
     bpy.utils.unregister_class(IkeaBrowserPreferences)
+    ikea.close()
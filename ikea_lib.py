@@ -1,13 +1,193 @@
 import typing as t
 import pathlib
+import base64
+import concurrent.futures
+import contextlib
+import http.client
 import json
 import logging
+import mmap
+import os
 import re
-import urllib.request
+import ssl
+import sys
+import tempfile
+import threading
+import time
 import urllib.parse
+import urllib.request
+import zlib
+
+try:
+    # orjson is several times faster, but isn't bundled with Blender -
+    # use it if the user has it installed, otherwise stick to the stdlib
+    import orjson  # type: ignore
+
+    def _loads(data: t.Union[str, bytes]) -> t.Any:
+        return orjson.loads(data)
+
+    def _load_file(path: pathlib.Path) -> t.Any:
+        # orjson can parse straight out of a memory map, without copying
+        # the whole file into a bytes object first
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
+except ImportError:
+    _loads = json.loads
+
+    def _load_file(path: pathlib.Path) -> t.Any:
+        return json.loads(path.read_bytes())
+
+try:
+    # Pillow isn't bundled with Blender either, so without it we just keep
+    # thumbnails at whatever size IKEA sends them
+    from PIL import Image  # type: ignore
+except ImportError:
+    Image = None
 
 log = logging.getLogger(__name__)
 
+TIMEOUT = 30
+MAX_REDIRECTS = 5
+DEFAULT_HEADERS = {
+    # Same as what urllib.request sends, which IKEA's servers are happy with
+    "User-Agent": "Python-urllib/%d.%d" % sys.version_info[:2],
+    # JSON responses compress very well; zlib can decode gzip but the
+    # stdlib has nothing for brotli
+    "Accept-Encoding": "gzip",
+}
+# This ID appears to be hard-coded in the website source code?
+ROTERA_HEADERS = {"X-Client-Id": "4863e7d2-1428-4324-890b-ae5dede24fc6"}
+# Shared by all connections, so that the system's CA certificates only
+# get loaded once rather than once per connection
+_SSL_CONTEXT = ssl.create_default_context()
+CHUNK_SIZE = 64 * 1024
+# tells zlib to expect a gzip header and trailer
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+PIP_CACHE_SIZE = 512
+SEARCH_CACHE_SIZE = 64
+MAX_WORKERS = 8
+PREFETCH_WORKERS = 4
+# The panels draw thumbnails at roughly this size, so there's no point
+# keeping (or uploading to the GPU) anything bigger
+THUMBNAIL_SIZE = (256, 256)
+# everything except the query itself
+SEARCH_PARAMS = {
+    "autocorrect": "true",
+    "subcategories-style": "tree-navigation",
+    "types": "PRODUCT",
+    "size": "24",
+    "c": "sr",
+    "v": "20210322",
+}
+# the per-item files that IkeaApiWrapper keeps in its cache_dir
+CACHED_FILES = ("pip.json", "thumbnail.jpg", "model.glb")
+_NON_DIGITS = re.compile(r"[^0-9]")
+# search results without these are skipped
+_REQUIRED_FIELDS = frozenset(("itemNo", "mainImageUrl", "mainImageAlt", "pipUrl"))
+
+
+def _env_int(name: str, default: int) -> int:
+    """
+    Read an integer setting from the environment - a typo in an optional
+    setting shouldn't stop the whole add-on from loading.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        log.warning("Ignoring %s=%r, it should be a whole number (using %d)", name, value, default)
+        return default
+
+
+# Limits for the on-disk thumbnail cache, see clean_thumbnails()
+THUMBNAIL_MAX_AGE = _env_int("IKEA_BROWSER_THUMBNAIL_MAX_AGE", 90 * 24 * 60 * 60)
+THUMBNAIL_MAX_COUNT = _env_int("IKEA_BROWSER_THUMBNAIL_MAX_COUNT", 5000)
+THUMBNAIL_MAX_BYTES = _env_int("IKEA_BROWSER_THUMBNAIL_MAX_BYTES", 256 * 1024 * 1024)
+
+
+def _is_gzipped(response: http.client.HTTPResponse) -> bool:
+    return response.headers.get("Content-Encoding", "").lower() == "gzip"
+
+
+@contextlib.contextmanager
+def _atomic_write(path: pathlib.Path) -> t.Iterator[t.BinaryIO]:
+    """
+    Write a file under a temporary name, and only move it into place once
+    the block completes - so an interrupted write (crash, full disk, network
+    error mid-download) never leaves a truncated file in the cache which
+    later calls would treat as valid.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # the temp file needs to be in the same directory for os.replace()
+    # to be atomic
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _shrink_image(path: pathlib.Path) -> None:
+    """
+    Scale a JPEG down to THUMBNAIL_SIZE in-place, if Pillow is available.
+    """
+    if Image is None:
+        return
+    try:
+        with Image.open(path) as im:
+            if im.width <= THUMBNAIL_SIZE[0] and im.height <= THUMBNAIL_SIZE[1]:
+                return
+            im.thumbnail(THUMBNAIL_SIZE, Image.LANCZOS)
+            small = im.convert("RGB")
+
+        with _atomic_write(path) as f:
+            small.save(f, "JPEG", quality=85, optimize=True)
+    except Exception:
+        # a full-size thumbnail still works, it's just bigger
+        log.exception("Error shrinking %s:", path)
+
+
+# the LRU caches get used from the download threads as well as the UI,
+# and they are reordered on every read
+_lru_lock = threading.Lock()
+
+
+def _lru_get(cache: t.Dict[t.Any, t.Any], key: t.Any) -> t.Any:
+    """
+    Get an item from a dict that is being used as an LRU cache (least
+    recently used first), or None if it isn't there.
+    """
+    with _lru_lock:
+        value = cache.pop(key, None)
+        if value is not None:
+            cache[key] = value
+        return value
+
+
+def _lru_put(cache: t.Dict[t.Any, t.Any], key: t.Any, value: t.Any, size: int) -> None:
+    with _lru_lock:
+        cache.pop(key, None)
+        if len(cache) >= size:
+            cache.pop(next(iter(cache)), None)
+        cache[key] = value
+
+
+def _log_missing_fields(products: t.List[t.Dict[str, t.Any]]) -> None:
+    """
+    Log which of the fields that we need each search result is missing.
+    """
+    for p in products:
+        missing = _REQUIRED_FIELDS - p.keys()
+        if p["itemType"] == "ART" and missing:
+            log.info("%s is missing %s", p.get("name", "?"), ", ".join(sorted(missing)))
+
 
 class IkeaException(Exception):
     pass
@@ -18,6 +198,195 @@ class IkeaApiWrapper:
         self.country = country
         self.language = language
         self.cache_dir = pathlib.Path("./cache")
+        self._search_url = f"https://sik.search.blue.cdtapps.com/{country}/{language}/search-result-page"
+        self._products_url = f"https://www.ikea.com/{country}/{language}/products"
+        self._rotera_url = f"https://web-api.ikea.com/{country}/{language}/rotera/data"
+        # parsed PIPs and search results, see _lru_get()
+        self._pips: t.Dict[str, t.Dict[str, t.Any]] = {}
+        self._searches: t.Dict[str, t.List[t.Dict[str, t.Any]]] = {}
+        # item numbers which have a given file in the cache, see _is_cached()
+        self._cache_index: t.Optional[t.Dict[str, t.Set[str]]] = None
+        self._cache_index_lock = threading.Lock()
+        # downloads which are currently running, see _once()
+        self._in_flight: t.Dict[pathlib.Path, concurrent.futures.Future] = {}
+        self._in_flight_lock = threading.Lock()
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ikea")
+        # a separate pool for prefetch(), so that speculative downloads
+        # never hold up something the user is actually waiting for
+        self._prefetch_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=PREFETCH_WORKERS, thread_name_prefix="ikea-prefetch"
+        )
+        # http.client connections aren't thread-safe, so each thread keeps
+        # its own keep-alive connection per host - that way a batch of
+        # downloads only pays for the TCP + TLS handshake once, rather than
+        # once per request
+        self._local = threading.local()
+        # the same proxy settings that urllib would use (environment
+        # variables, or the system settings on Windows and macOS), and
+        # which proxy each host goes through, see _proxy()
+        self._proxies = urllib.request.getproxies()
+        self._proxy_hosts: t.Dict[t.Tuple[str, str], t.Optional[t.Tuple[str, t.Dict[str, str]]]] = {}
+        # every thread's connections (and which thread they belong to), so
+        # that close() can get at them
+        self._connections: t.Dict[http.client.HTTPConnection, int] = {}
+        # threads which are in the middle of a request, see _using_connections()
+        self._busy: t.Set[int] = set()
+        self._closed = False
+        self._connections_lock = threading.Lock()
+
+    def __enter__(self) -> "IkeaApiWrapper":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self, wait: bool = False) -> None:
+        """
+        Stop the background download threads and close all connections.
+
+        With `wait`, downloads which have already been queued are allowed
+        to finish first, rather than being cancelled. Either way, requests
+        which other threads are in the middle of are left to finish, and
+        those threads close their connections afterwards.
+        """
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+        self._prefetch_pool.shutdown(wait=wait, cancel_futures=not wait)
+        with self._connections_lock:
+            self._closed = True
+            for conn, owner in list(self._connections.items()):
+                # other threads might be half-way through reading a
+                # response - they close their own once they're done
+                if owner not in self._busy:
+                    conn.close()
+                    del self._connections[conn]
+
+    def _proxy(self, scheme: str, host: str) -> t.Optional[t.Tuple[str, t.Dict[str, str]]]:
+        """
+        Find out whether requests to a host should go through a proxy, and
+        if so, return the proxy's host:port and any headers it needs.
+        """
+        key = (scheme, host)
+        if key not in self._proxy_hosts:
+            proxy = self._proxies.get(scheme)
+            if proxy and not urllib.request.proxy_bypass(host):
+                # same as urllib, a proxy can be given without the scheme
+                parts = urllib.parse.urlsplit(proxy if "://" in proxy else "http://" + proxy)
+                headers = {}
+                if parts.username:
+                    creds = f"{urllib.parse.unquote(parts.username)}:{urllib.parse.unquote(parts.password or '')}"
+                    headers["Proxy-Authorization"] = "Basic " + base64.b64encode(creds.encode()).decode()
+                self._proxy_hosts[key] = (parts.netloc.rpartition("@")[2], headers)
+            else:
+                self._proxy_hosts[key] = None
+        return self._proxy_hosts[key]
+
+    def _connection(self, scheme: str, host: str) -> http.client.HTTPConnection:
+        conns = self._local.__dict__.setdefault("by_host", {})
+        if (scheme, host) not in conns:
+            proxy = self._proxy(scheme, host)
+            if scheme == "https" and proxy:
+                # tunnel through the proxy with CONNECT, and then talk TLS
+                # to the real host as usual
+                conn = http.client.HTTPSConnection(proxy[0], timeout=TIMEOUT, context=_SSL_CONTEXT)
+                conn.set_tunnel(host, headers=proxy[1])
+            elif scheme == "https":
+                conn = http.client.HTTPSConnection(host, timeout=TIMEOUT, context=_SSL_CONTEXT)
+            elif proxy:
+                # plain HTTP goes to the proxy with the full URL, see _request()
+                conn = http.client.HTTPConnection(proxy[0], timeout=TIMEOUT)
+            else:
+                conn = http.client.HTTPConnection(host, timeout=TIMEOUT)
+            conns[(scheme, host)] = conn
+            with self._connections_lock:
+                self._connections[conn] = threading.get_ident()
+        return conns[(scheme, host)]
+
+    def _close_connections(self) -> None:
+        """
+        Close this thread's connections, eg after a failed read has left one
+        of them in an unknown state.
+        """
+        for conn in self._local.__dict__.pop("by_host", {}).values():
+            conn.close()
+            with self._connections_lock:
+                self._connections.pop(conn, None)
+
+    @contextlib.contextmanager
+    def _using_connections(self) -> t.Iterator[None]:
+        """
+        Mark this thread as being in the middle of a request, so that
+        close() leaves its connections alone - if we were closed in the
+        meantime, then this thread closes them itself afterwards.
+        """
+        me = threading.get_ident()
+        with self._connections_lock:
+            self._busy.add(me)
+        try:
+            yield
+        finally:
+            with self._connections_lock:
+                self._busy.discard(me)
+                closed = self._closed
+            if closed:
+                self._close_connections()
+
+    def _request(
+        self,
+        url: str,
+        *args,
+        params: t.Dict[str, str] = {},
+        headers: t.Dict[str, str] = {},
+    ) -> http.client.HTTPResponse:
+        """
+        Send a GET request over a kept-alive connection, following redirects.
+
+        The caller must read the whole response before making another
+        request from the same thread.
+        """
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        headers = {**DEFAULT_HEADERS, **headers}
+
+        for _ in range(MAX_REDIRECTS):
+            parts = urllib.parse.urlsplit(url)
+            path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+            request_headers = headers
+            proxy = self._proxy(parts.scheme, parts.netloc)
+            if parts.scheme == "http" and proxy:
+                path = urllib.parse.urlunsplit(parts._replace(fragment=""))
+                request_headers = {**headers, **proxy[1]}
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                try:
+                    conn.request("GET", path, headers=request_headers)
+                    response = conn.getresponse()
+                except (
+                    http.client.RemoteDisconnected,
+                    http.client.CannotSendRequest,
+                    ConnectionResetError,
+                    ConnectionAbortedError,
+                    BrokenPipeError,
+                ):
+                    # the server dropped our idle keep-alive connection,
+                    # try once more with a fresh one
+                    conn.close()
+                    conn.request("GET", path, headers=request_headers)
+                    response = conn.getresponse()
+            except Exception:
+                # don't leave a half-used connection lying around
+                conn.close()
+                raise
+
+            if response.status in {301, 302, 303, 307, 308} and "Location" in response.headers:
+                response.read()
+                url = urllib.parse.urljoin(url, response.headers["Location"])
+                continue
+            if response.status >= 400:
+                response.read()
+                raise IkeaException(f"HTTP Error {response.status}: {response.reason}")
+            return response
+
+        raise IkeaException("Too many redirects")
 
     def _get(
         self,
@@ -25,17 +394,136 @@ class IkeaApiWrapper:
         *args,
         params: t.Dict[str, str] = {},
         headers: t.Dict[str, str] = {},
-    ) -> str:
+    ) -> bytes:
         try:
-            return urllib.request.urlopen(
-                urllib.request.Request(
-                    url + "?" + urllib.parse.urlencode(params), headers=headers
-                )
-            ).read()
+            with self._using_connections():
+                response = self._request(url, params=params, headers=headers)
+                try:
+                    data = response.read()
+                except Exception:
+                    self._close_connections()
+                    raise
+            if _is_gzipped(response):
+                data = zlib.decompress(data, wbits=GZIP_WBITS)
+            return data
         except Exception as e:
-            log.exception(f"Error fetching {url}:")
+            log.exception("Error fetching %s:", url)
             raise IkeaException(f"Error fetching {url}: {e}")
 
+    def _download(
+        self,
+        url: str,
+        cache_path: pathlib.Path,
+        *args,
+        headers: t.Dict[str, str] = {},
+        refresh: bool = False,
+    ) -> bool:
+        """
+        Stream a file straight to disk, rather than holding the whole thing
+        in memory. The file is written under a temporary name and then moved
+        into place, so an interrupted download never leaves a truncated file
+        in the cache.
+
+        With `refresh`, an existing file is re-validated using the ETag
+        saved alongside it, so if it hasn't changed then the server only
+        needs to send an empty "304 Not Modified".
+
+        Returns False if our existing copy was still up to date.
+        """
+        etag_path = cache_path.with_suffix(".etag")
+        if refresh and cache_path.exists():
+            try:
+                headers = {**headers, "If-None-Match": etag_path.read_text()}
+            except FileNotFoundError:
+                pass
+
+        with self._using_connections():
+            response = self._request(url, headers=headers)
+            if response.status == 304:
+                response.read()
+                return False
+
+            with _atomic_write(cache_path) as f:
+                # reuse one buffer for the whole file, rather than allocating
+                # a new bytes object for every chunk
+                buf = memoryview(bytearray(CHUNK_SIZE))
+                decoder = zlib.decompressobj(wbits=GZIP_WBITS) if _is_gzipped(response) else None
+                try:
+                    while n := response.readinto(buf):
+                        f.write(decoder.decompress(buf[:n]) if decoder else buf[:n])
+                except Exception:
+                    self._close_connections()
+                    raise
+                if decoder:
+                    f.write(decoder.flush())
+
+        etag = response.headers.get("ETag")
+        if etag:
+            with _atomic_write(etag_path) as f:
+                f.write(etag.encode())
+        else:
+            etag_path.unlink(missing_ok=True)
+        return True
+
+    def _once(self, cache_path: pathlib.Path, fetch: t.Callable[[], None]) -> None:
+        """
+        Run fetch() to download cache_path - unless another thread is
+        already downloading it, in which case wait for that one to finish
+        (and raise its exception if it failed).
+        """
+        with self._in_flight_lock:
+            future = self._in_flight.get(cache_path)
+            owner = future is None
+            if future is None:
+                future = self._in_flight[cache_path] = concurrent.futures.Future()
+
+        if owner:
+            try:
+                fetch()
+                future.set_result(None)
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._in_flight_lock:
+                    del self._in_flight[cache_path]
+        future.result()
+
+    def _is_cached(self, itemNo: str, filename: str) -> bool:
+        """
+        Check whether an item's file is in the cache without touching the
+        filesystem - the cache directory is scanned once, the first time we
+        ask about anything.
+        """
+        if self._cache_index is None:
+            with self._cache_index_lock:
+                if self._cache_index is None:
+                    self._cache_index = self._scan_cache()
+        return itemNo in self._cache_index[filename]
+
+    def _scan_cache(self) -> t.Dict[str, t.Set[str]]:
+        index: t.Dict[str, t.Set[str]] = {filename: set() for filename in CACHED_FILES}
+        try:
+            with os.scandir(self.cache_dir) as items:
+                for item in items:
+                    if not item.is_dir():
+                        continue
+                    with os.scandir(item.path) as files:
+                        for file in files:
+                            if file.name in index:
+                                index[file.name].add(item.name)
+        except FileNotFoundError:
+            pass
+        return index
+
+    def _set_cached(self, itemNo: str, filename: str, cached: bool) -> None:
+        # if the index hasn't been built yet, then the scan will find
+        # out for itself
+        if self._cache_index is not None:
+            if cached:
+                self._cache_index[filename].add(itemNo)
+            else:
+                self._cache_index[filename].discard(itemNo)
+
     def _get_json(
         self,
         url: str,
@@ -43,134 +531,307 @@ class IkeaApiWrapper:
         params: t.Dict[str, str] = {},
         headers: t.Dict[str, str] = {},
     ) -> t.Dict[str, t.Any]:
-        return json.loads(self._get(url, *args, params=params, headers=headers))
+        return _loads(self._get(url, *args, params=params, headers=headers))
 
     def format(self, itemNo: str) -> str:
-        itemNo = re.sub(r"[^0-9]", "", itemNo)
+        itemNo = _NON_DIGITS.sub("", itemNo)
         return itemNo[0:3] + "." + itemNo[3:6] + "." + itemNo[6:8]
 
-    def search(self, query: str) -> t.List[t.Dict[str, t.Any]]:
+    def search(self, query: str, prefetch: bool = False) -> t.List[t.Dict[str, t.Any]]:
+        """
+        Search for products. Recent results are kept in memory, so going
+        back to an earlier query doesn't need another request.
+
+        With `prefetch`, also start downloading each result's PIP in the
+        background (see prefetch() - thumbnails are not included).
+        """
+        results = _lru_get(self._searches, query)
+        if results is None:
+            results = self._search(query)
+            _lru_put(self._searches, query, results, SEARCH_CACHE_SIZE)
+        if prefetch:
+            self.prefetch(results)
+        return results
+
+    def _search(self, query: str) -> t.List[t.Dict[str, t.Any]]:
         log.debug("Searching for %s", query)
         try:
-            url = f"https://sik.search.blue.cdtapps.com/{self.country}/{self.language}/search-result-page"
-            params = {
-                "autocorrect": "true",
-                "subcategories-style": "tree-navigation",
-                "types": "PRODUCT",
-                "q": query,
-                "size": "24",
-                "c": "sr",
-                "v": "20210322",
-            }
-            search_results = self._get_json(url, params=params)
+            search_results = self._get_json(self._search_url, params={**SEARCH_PARAMS, "q": query})
             # (self.cache_dir.parent / "search.json").write_text(json.dumps(search_results))
             # search_results = json.loads((self.cache_dir.parent / "search.json").read_text())
         except Exception as e:
-            log.exception(f"Error searching for {query}:")
+            log.exception("Error searching for %s:", query)
             raise IkeaException(f"Error searching for {query}: {e}")
 
-        results = []
-        for i in search_results["searchResultPage"]["products"]["main"]["items"]:
-            p = i["product"]
-            if p["itemType"] != "ART":
-                continue
-
-            valid = True
-            for field in {"itemNo", "mainImageUrl", "mainImageAlt", "pipUrl"}:
-                if field not in p:
-                    name = p["name"]
-                    log.info(f"{name} is missing {field}")
-                    valid = False
-
-            if valid:
-                results.append(
-                    {
-                        "itemNo": p["itemNo"],
-                        # "name": p['name'],
-                        # "typeName": p['typeName'],
-                        # "itemMeasureReferenceText": p['itemMeasureReferenceText'],
-                        "mainImageUrl": p["mainImageUrl"],
-                        "mainImageAlt": p["mainImageAlt"],
-                        "pipUrl": p["pipUrl"],
-                    }
-                )
+        products = [i["product"] for i in search_results["searchResultPage"]["products"]["main"]["items"]]
+        results = [
+            {
+                "itemNo": p["itemNo"],
+                # "name": p['name'],
+                # "typeName": p['typeName'],
+                # "itemMeasureReferenceText": p['itemMeasureReferenceText'],
+                "mainImageUrl": p["mainImageUrl"],
+                "mainImageAlt": p["mainImageAlt"],
+                "pipUrl": p["pipUrl"],
+            }
+            for p in products
+            # a plain subset check, rather than a function call per product
+            if p["itemType"] == "ART" and _REQUIRED_FIELDS <= p.keys()
+        ]
+        if len(results) < len(products):
+            # only go back over the products to say why, if we skipped any
+            _log_missing_fields(products)
         return results
 
-    def get_pip(self, itemNo: str) -> t.Dict[str, t.Any]:
+    def prefetch(self, results: t.List[t.Dict[str, t.Any]]) -> t.List[concurrent.futures.Future]:
+        """
+        Start downloading PIPs for a list of search results in the
+        background, so that they are ready by the time the user looks at
+        them.
+
+        This doesn't fetch thumbnails: the add-on already queues every
+        result's thumbnail on its own workers (which also load them into
+        Blender), so fetching them here too would just download each one
+        twice. Callers without such workers can use get_thumbnails().
+
+        Returns the futures for the downloads, for anybody who wants to
+        wait for them (errors are already logged by get_pip, so there's no
+        need to check).
+        """
+        futures = []
+        try:
+            for result in results:
+                itemNo = result["itemNo"]
+                if itemNo not in self._pips and not self._is_cached(itemNo, "pip.json"):
+                    futures.append(self._prefetch_pool.submit(self.get_pip, itemNo))
+        except RuntimeError:
+            # we were close()d while the search was running, so nobody
+            # is going to want these any more
+            pass
+        return futures
+
+    def get_pip(self, itemNo: str, refresh: bool = False) -> t.Dict[str, t.Any]:
         """
         Get product information for the given item number.
+
+        The most recently used PIPs are kept in memory, as the product
+        panel asks for one on every redraw. `refresh` checks with IKEA
+        for a newer version.
         """
-        log.debug(f"Getting PIP for #{itemNo}")
+        if not refresh:
+            pip = _lru_get(self._pips, itemNo)
+            if pip is not None:
+                return pip
+
+        log.debug("Getting PIP for #%s", itemNo)
         cache_path = self.cache_dir / itemNo / "pip.json"
 
-        if not cache_path.exists():
+        if not refresh and self._is_cached(itemNo, "pip.json"):
             try:
-                log.info(f"Downloading PIP for #{itemNo}")
-                url = f"https://www.ikea.com/{self.country}/{self.language}/products/{itemNo[5:]}/{itemNo}.json"
-                data = self._get_json(url)
-                cache_path.parent.mkdir(parents=True, exist_ok=True)
-                cache_path.write_text(json.dumps(data))
+                return self._load_pip(itemNo, cache_path)
+            except FileNotFoundError:
+                # deleted since we scanned the cache, so fetch it again
+                self._set_cached(itemNo, "pip.json", False)
+
+        def fetch() -> None:
+            try:
+                log.info("Downloading PIP for #%s", itemNo)
+                url = f"{self._products_url}/{itemNo[5:]}/{itemNo}.json"
+                self._download(url, cache_path, refresh=refresh)
+                self._set_cached(itemNo, "pip.json", True)
             except Exception as e:
-                log.exception(f"Error downloading PIP for #{itemNo}")
+                log.exception("Error downloading PIP for #%s", itemNo)
                 raise IkeaException(f"Error downloading PIP for #{itemNo}: {e}")
 
-        return json.loads(cache_path.read_text())
+        self._once(cache_path, fetch)
+        return self._load_pip(itemNo, cache_path)
 
-    def get_thumbnail(self, itemNo: str, url: str) -> str:
+    def _load_pip(self, itemNo: str, cache_path: pathlib.Path) -> t.Dict[str, t.Any]:
+        try:
+            pip = _load_file(cache_path)
+        except ValueError as e:
+            # don't keep serving a broken file from the cache
+            cache_path.unlink(missing_ok=True)
+            self._set_cached(itemNo, "pip.json", False)
+            raise IkeaException(f"Invalid PIP for #{itemNo}: {e}")
+
+        _lru_put(self._pips, itemNo, pip, PIP_CACHE_SIZE)
+        return pip
+
+    def get_pip_future(self, itemNo: str) -> "concurrent.futures.Future[t.Dict[str, t.Any]]":
         """
-        Get a thumbnail for the given product.
+        Like get_pip(), but returns a Future instead of blocking. If the PIP
+        is already in memory then the future is already done.
+        """
+        pip = self._pips.get(itemNo)
+        if pip is not None:
+            future: "concurrent.futures.Future[t.Dict[str, t.Any]]" = concurrent.futures.Future()
+            future.set_result(pip)
+            return future
+        return self._pool.submit(self.get_pip, itemNo)
+
+    def get_pips(self, itemNos: t.List[str]) -> t.Dict[str, t.Dict[str, t.Any]]:
+        """
+        Get product information for a batch of item numbers, downloading
+        any missing ones in parallel.
+
+        Returns a dict of item number to PIP; products whose PIP couldn't
+        be downloaded are left out (the errors are logged by get_pip).
+        """
+        pips = {}
+        futures = {self._pool.submit(self.get_pip, itemNo): itemNo for itemNo in itemNos}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                pips[futures[future]] = future.result()
+            except IkeaException:
+                pass
+        return pips
+
+    def get_thumbnail(self, itemNo: str, url: str, refresh: bool = False) -> str:
+        """
+        Get a thumbnail for the given product, and with `refresh`, check
+        with IKEA for a newer version.
 
         Returns the path to the downloaded thumbnail in JPEG format.
         """
-        log.debug(f"Getting thumbnail for #{itemNo}")
+        log.debug("Getting thumbnail for #%s", itemNo)
         cache_path = self.cache_dir / itemNo / "thumbnail.jpg"
 
-        if not cache_path.exists():
+        def fetch() -> None:
             try:
-                log.info(f"Downloading thumbnail for #{itemNo}")
-                data = self._get(url)
-                cache_path.parent.mkdir(parents=True, exist_ok=True)
-                cache_path.write_bytes(data)
+                log.info("Downloading thumbnail for #%s", itemNo)
+                if self._download(url, cache_path, refresh=refresh):
+                    _shrink_image(cache_path)
+                self._set_cached(itemNo, "thumbnail.jpg", True)
             except Exception as e:
-                log.exception(f"Error downloading thumbnail for #{itemNo}:")
+                log.exception("Error downloading thumbnail for #%s:", itemNo)
                 raise IkeaException(f"Error downloading thumbnail for #{itemNo}: {e}")
 
+        if refresh or not self._is_cached(itemNo, "thumbnail.jpg"):
+            self._once(cache_path, fetch)
         return str(cache_path)
 
+    def get_thumbnails(self, items: t.List[t.Tuple[str, str]]) -> t.Dict[str, str]:
+        """
+        Get thumbnails for a batch of (itemNo, url) pairs, downloading any
+        missing ones in parallel.
+
+        Returns a dict of item number to thumbnail path; products whose
+        thumbnail couldn't be downloaded are left out (the errors are
+        logged by get_thumbnail).
+        """
+        paths = {}
+        futures = {}
+        for itemNo, url in items:
+            if self._is_cached(itemNo, "thumbnail.jpg"):
+                paths[itemNo] = str(self.cache_dir / itemNo / "thumbnail.jpg")
+            else:
+                futures[self._pool.submit(self.get_thumbnail, itemNo, url)] = itemNo
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                paths[futures[future]] = future.result()
+            except IkeaException:
+                pass
+        return paths
+
+    def clean_thumbnails(
+        self,
+        max_age: int = THUMBNAIL_MAX_AGE,
+        max_count: int = THUMBNAIL_MAX_COUNT,
+        max_bytes: int = THUMBNAIL_MAX_BYTES,
+    ) -> None:
+        """
+        Delete thumbnails which haven't been used for `max_age` seconds,
+        then delete the least recently used ones until the cache is down to
+        `max_count` files and `max_bytes` bytes.
+
+        Also deletes any temporary files left behind by downloads that
+        were killed part-way through.
+        """
+        now = time.time()
+        for path in self.cache_dir.glob("*/*.part"):
+            try:
+                # a newer one might still be being written by another
+                # copy of blender
+                if now - path.stat().st_mtime > 24 * 60 * 60:
+                    log.debug("Removing partial download %s", path)
+                    path.unlink()
+            except OSError:
+                pass
+
+        thumbnails = []
+        for path in self.cache_dir.glob("*/thumbnail.jpg"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            # atime is frozen on noatime filesystems (and only updated
+            # once a day with relatime), so never treat a file as older
+            # than its last write
+            thumbnails.append((max(st.st_atime, st.st_mtime), st.st_size, path))
+
+        # newest first, so that we keep as many recent thumbnails as we can
+        thumbnails.sort(reverse=True)
+        count = 0
+        total = 0
+        for used, size, path in thumbnails:
+            if now - used < max_age and count < max_count and total + size <= max_bytes:
+                count += 1
+                total += size
+                continue
+            log.debug("Removing old thumbnail %s", path)
+            try:
+                path.unlink()
+                path.with_suffix(".etag").unlink(missing_ok=True)
+                self._set_cached(path.parent.name, "thumbnail.jpg", False)
+            except OSError:
+                log.exception("Error removing %s", path)
+        log.debug("Thumbnail cache has %d files, %d bytes", count, total)
+
     def get_model(self, itemNo: str) -> str:
         """
         Get a 3D model for the given product.
 
         Returns the path to the downloaded model in GLB format.
         """
-        log.debug(f"Getting model for #{itemNo}")
-        cache_path = self.cache_dir / itemNo / "model.glb"
-        if not cache_path.exists():
-            log.info(f"Downloading model for #{itemNo}")
-            try:
-                # This ID appears to be hard-coded in the website source code?
-                headers = {"X-Client-Id": "4863e7d2-1428-4324-890b-ae5dede24fc6"}
-                rotera_exists = self._get_json(
-                    f"https://web-api.ikea.com/{self.country}/{self.language}/rotera/data/exists/{itemNo}",
-                    headers=headers,
-                )
-                log.debug("Exists data: %r", rotera_exists)
-                if not rotera_exists["exists"]:
-                    raise IkeaException(f"No model available for #{itemNo}")
-
-                rotera_data = self._get_json(
-                    f"https://web-api.ikea.com/{self.country}/{self.language}/rotera/data/model/{itemNo}",
-                    headers=headers,
-                )
-                log.debug("Model metadata: %r", rotera_data)
-                data = self._get(rotera_data["modelUrl"])
-                cache_path.parent.mkdir(parents=True, exist_ok=True)
-                cache_path.write_bytes(data)
-            except Exception as e:
-                log.exception(f"Error downloading model for #{itemNo}:")
-                raise IkeaException(f"Error downloading model for #{itemNo}: {e}")
+        return self.get_models([itemNo])[itemNo]
 
-        return str(cache_path)
+    def get_models(self, itemNos: t.List[str]) -> t.Dict[str, str]:
+        """
+        Get 3D models for the given products, downloading any missing ones
+        in parallel.
+
+        Returns a dict of item number to the path of the downloaded model
+        in GLB format.
+        """
+        log.debug("Getting models for %s", itemNos)
+        cache_paths = {itemNo: self.cache_dir / itemNo / "model.glb" for itemNo in itemNos}
+        missing = [itemNo for itemNo in itemNos if not self._is_cached(itemNo, "model.glb")]
+
+        if missing:
+            # one task per item, so that items download in parallel, while
+            # each item only asks for its model once IKEA says it has one
+            downloads = [self._pool.submit(self._download_model, itemNo, cache_paths[itemNo]) for itemNo in missing]
+            for download in downloads:
+                download.result()
+
+        return {itemNo: str(cache_path) for itemNo, cache_path in cache_paths.items()}
+
+    def _download_model(self, itemNo: str, cache_path: pathlib.Path) -> None:
+        log.info("Downloading model for #%s", itemNo)
+        try:
+            rotera_exists = self._get_json(f"{self._rotera_url}/exists/{itemNo}", headers=ROTERA_HEADERS)
+            log.debug("Exists data: %r", rotera_exists)
+            if not rotera_exists["exists"]:
+                raise IkeaException(f"No model available for #{itemNo}")
+
+            rotera_data = self._get_json(f"{self._rotera_url}/model/{itemNo}", headers=ROTERA_HEADERS)
+            log.debug("Model metadata: %r", rotera_data)
+            self._download(rotera_data["modelUrl"], cache_path)
+            self._set_cached(itemNo, "model.glb", True)
+        except Exception as e:
+            log.exception("Error downloading model for #%s:", itemNo)
+            raise IkeaException(f"Error downloading model for #{itemNo}: {e}")
 
 
 if __name__ == "__main__":
@@ -189,13 +850,14 @@ if __name__ == "__main__":
     metadata_parser = subparsers.add_parser("metadata")
     metadata_parser.add_argument("itemNo", type=str)
     model_parser = subparsers.add_parser("model")
-    model_parser.add_argument("itemNo", type=str)
+    model_parser.add_argument("itemNo", type=str, nargs="+")
     args = parser.parse_args()
 
-    ikea = IkeaApiWrapper(args.country, args.language)
-    if args.cmd == "search":
-        print(json.dumps(ikea.search(" ".join(args.query)), indent=4))
-    if args.cmd == "metadata":
-        print(json.dumps(ikea.get_pip(args.itemNo), indent=4))
-    if args.cmd == "model":
-        print(ikea.get_model(args.itemNo))
+    with IkeaApiWrapper(args.country, args.language) as ikea:
+        if args.cmd == "search":
+            print(json.dumps(ikea.search(" ".join(args.query)), indent=4))
+        if args.cmd == "metadata":
+            print(json.dumps(ikea.get_pip(args.itemNo), indent=4))
+        if args.cmd == "model":
+            for path in ikea.get_models(args.itemNo).values():
+                print(path)